@@ -1,19 +1,50 @@
 from __future__ import annotations
 
+import abc
 import argparse
+import contextlib
+import importlib.util
+import os
+import queue
 import re
 import shutil
+import stat
 import subprocess
 import sys
-import tempfile
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass
-from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
 import numpy as np
 import soundfile as sf
 
+if TYPE_CHECKING:
+    import torch
+
+# Decode target for ffmpeg; matches every pretrained Demucs model.
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+# Fraction of each Demucs segment cross-faded with its neighbour (demucs' default).
+SEGMENT_OVERLAP = 0.25
+# Separated chunks buffered per stem before the separator waits on the encoder.
+ENCODER_QUEUE_SIZE = 4
+# Pinned host buffers for GPU->host copies: a full queue, the chunk an encoder is
+# working on, and the one being filled.
+PINNED_BUFFERS = ENCODER_QUEUE_SIZE + 2
+# Bytes read per call from a subprocess's stdout.
+PIPE_READ_SIZE = 1 << 20
+
+# Echo subprocess commands and let ffmpeg print its banner/stats; set by --verbose.
+_VERBOSE = False
+
+_NON_ALNUM = re.compile(r"[^A-Za-z0-9]+")
+_CAMEL_BOUNDARY = re.compile(r"([a-z0-9])([A-Z])")
+
 
 @dataclass
 class AppError(Exception):
@@ -34,24 +65,40 @@ def which_or_fail(bin_name: str) -> str:
     return p
 
 
-def run(cmd: list[str]) -> None:
-    print(">>", " ".join(cmd))
-    try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        raise AppError(f"Command failed ({e.returncode}): {' '.join(cmd)}", 10)
+def ffmpeg_log_args() -> list[str]:
+    # Errors still reach stderr; banner, per-stream info and progress stats only with --verbose
+    if _VERBOSE:
+        return []
+    return ["-hide_banner", "-nostats", "-loglevel", "error"]
 
 
+def run(cmd: list[str]) -> bytearray:
+    """
+    Runs cmd and returns its stdout, read into a single growable (writable) buffer.
+    """
+    if _VERBOSE:
+        print(">>", *cmd)
+    out = bytearray()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE) as proc:
+        assert proc.stdout is not None
+        while chunk := proc.stdout.read(PIPE_READ_SIZE):
+            out += chunk
+    if proc.returncode != 0:
+        raise AppError(f"Command failed ({proc.returncode}): {' '.join(cmd)}", 10)
+    return out
+
+
+@lru_cache(maxsize=1024)
 def to_snake_case(name: str) -> str:
     name = name.strip()
-    name = re.sub(r"[^A-Za-z0-9]+", "_", name)
-    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
+    name = _NON_ALNUM.sub("_", name)
+    name = _CAMEL_BOUNDARY.sub(r"\1_\2", name)
     name = name.lower().strip("_")
     return name or "track"
 
 
 def stamp_yyyymmdd() -> str:
-    return datetime.now().strftime("%Y%m%d")
+    return time.strftime("%Y%m%d")
 
 
 def pick_device(requested: str) -> str:
@@ -67,85 +114,458 @@ def pick_device(requested: str) -> str:
     return "cpu"
 
 
+def pick_precision(requested: str, device: str) -> str:
+    """
+    Reduced precision is only used on CUDA; 'auto' picks bf16 on Ampere and newer, which
+have bf16 tensor cores, and fp16 on older GPUs (where bf16 would only be emulated).
+    """
+    if device != "cuda":
+        return "fp32"
+    if requested != "auto":
+        return requested
+
+    try:
+        import torch  # type: ignore
+    except Exception as e:
+        raise AppError(f"Failed to import Demucs dependencies: {e}", 20)
+    major, _ = torch.cuda.get_device_capability()
+    return "bf16" if major >= 8 else "fp16"
+
+
+def disable_autograd() -> None:
+    """
+    This CLI never trains, so skip autograd's per-op dispatch for everything outside
+    the inference_mode() blocks too. Grad mode is thread-local: call from the thread
+    that runs separation.
+    """
+    try:
+        import torch  # type: ignore
+    except Exception:
+        # Reported properly when the model is loaded
+        return
+    torch.set_grad_enabled(False)
+
+
 def validate_input_file(inp: Path) -> None:
-    if not inp.exists():
-        raise AppError(f"Input file not found: {inp}", 4)
-    if inp.is_dir():
-        raise AppError(f"Input path is a directory, expected a media file: {inp}", 4)
+    # One stat(2) covers existence, type and size
     try:
-        if inp.stat().st_size < 1024:
-            raise AppError(f"Input file looks too small to be a valid media file: {inp}", 4)
+        st = inp.stat()
+    except FileNotFoundError:
+        raise AppError(f"Input file not found: {inp}", 4)
     except OSError:
         raise AppError(f"Unable to read input file: {inp}", 4)
+    if stat.S_ISDIR(st.st_mode):
+        raise AppError(f"Input path is a directory, expected a media file: {inp}", 4)
+    if st.st_size < 1024:
+        raise AppError(f"Input file looks too small to be a valid media file: {inp}", 4)
 
 
-def ffmpeg_convert_to_wav(ffmpeg: str, inp: Path, out_wav: Path) -> None:
+def ffmpeg_decode_to_array(ffmpeg: str, inp: Path, samplerate: int, channels: int) -> np.ndarray:
+    """
+    Decodes any media file to raw float32 PCM piped over stdout (no temp WAV).
+    Returns a [C, T] view over the interleaved buffer, so the track is held once.
+    """
     cmd = [
         ffmpeg,
-        "-y",
+        *ffmpeg_log_args(),
+        # Runs in the background next to the progress bar; keep it off the terminal
+        "-nostdin",
         "-vn",
         "-i",
         str(inp),
+        "-f",
+        "f32le",
         "-ac",
-        "2",
+        str(channels),
         "-ar",
-        "44100",
-        str(out_wav),
+        str(samplerate),
+        "pipe:1",
     ]
-    run(cmd)
+    raw = run(cmd)
+    if not raw:
+        raise AppError(f"ffmpeg produced no audio for: {inp}", 11)
+    frames = len(raw) // (4 * channels)
+    pcm = np.frombuffer(raw, dtype="<f4", count=frames * channels).reshape(frames, channels)
+    return pcm.T
 
 
-def audio_to_mp3(ffmpeg: str, inp_audio: Path, out_mp3: Path, bitrate: str) -> None:
-    cmd = [
-        ffmpeg,
-        "-y",
-        "-i",
-        str(inp_audio),
-        "-vn",
-        "-codec:a",
-        "libmp3lame",
-        "-b:a",
-        bitrate,
-        str(out_mp3),
-    ]
-    run(cmd)
+def read_wav_direct(inp: Path, samplerate: int, channels: int) -> Optional[np.ndarray]:
+    """
+    Reads a WAV that is already at the decode target straight through soundfile,
+    skipping the ffmpeg decode. Returns None for anything that still needs ffmpeg.
+    """
+    if inp.suffix.lower() != ".wav":
+        return None
+    # soundfile's LibsndfileError is a RuntimeError; fall back to ffmpeg on any read failure
+    try:
+        info = sf.info(str(inp))
+        if info.samplerate != samplerate or info.channels != channels:
+            return None
+        pcm, _ = sf.read(str(inp), dtype="float32", always_2d=True)
+    except RuntimeError:
+        return None
+    if not pcm.size:
+        return None
+    return pcm.T
+
+
+def decode_input(ffmpeg: str, inp: Path, samplerate: int, channels: int) -> np.ndarray:
+    wav = read_wav_direct(inp, samplerate, channels)
+    if wav is None:
+        wav = ffmpeg_decode_to_array(ffmpeg, inp, samplerate, channels)
+    return wav
+
+
+def parse_bitrate_kbps(bitrate: str) -> int:
+    value = bitrate.strip().lower()
+    try:
+        kbps = int(value[:-1]) if value.endswith("k") else int(value) // 1000
+    except ValueError:
+        kbps = 0
+    if kbps <= 0:
+        raise AppError(f"Invalid MP3 bitrate: {bitrate!r} (expected e.g. 192k)", 2)
+    return kbps
 
 
-def separate_with_demucs_library(
-    wav_path: Path,
-    model_name: str,
-    device: str,
-    out_dir: Path,
-) -> tuple[Path, Path]:
+def f32_to_i16(pcm: np.ndarray, out: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    """
+    Clips, scales and rounds float32 PCM into the preallocated int16 `out`, using the
+    preallocated float32 `scratch`, so no temporaries are allocated per chunk.
+    """
+    np.clip(pcm, -1.0, 1.0, out=scratch)
+    np.multiply(scratch, 32767.0, out=scratch)
+    np.rint(scratch, out=scratch)
+    np.copyto(out, scratch, casting="unsafe")
+    return out
+
+
+class StemEncoder(abc.ABC):
+    """
+    Encodes interleaved float32 PCM chunks to MP3. Every encoder receives the same
+    [T, K*C] chunk holding all K stems side by side and encodes the channels it owns.
+    Chunks are queued and encoded on a background thread so encoding overlaps with
+    separation; the bounded queue applies backpressure. Output goes to a `.part`
+    sibling that only replaces the real MP3 once encoding has succeeded.
+    """
+
+    def __init__(self, out_mp3s: list[Path]) -> None:
+        self.out_mp3s = out_mp3s
+        self.part_paths = [p.with_name(p.name + ".part") for p in out_mp3s]
+        self.error: Optional[Exception] = None
+        self.queue: queue.Queue[Optional[np.ndarray]] = queue.Queue(maxsize=ENCODER_QUEUE_SIZE)
+        # Started by subclasses once their output is open
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+
+    def _drain(self) -> None:
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            if self.error is not None:
+                # The encoder has failed; keep draining so the producer never blocks
+                continue
+            try:
+                self._encode(chunk)
+            except Exception as e:
+                self.error = e
+
+    @abc.abstractmethod
+    def _encode(self, chunk: np.ndarray) -> None:
+        """Encodes one chunk; runs on the encoder thread."""
+
+    @abc.abstractmethod
+    def _finish(self) -> None:
+        """Flushes and closes the output once the thread has drained; raises AppError on failure."""
+
+    def _kill(self) -> None:
+        pass
+
+    def _release(self) -> None:
+        pass
+
+    def _discard(self) -> None:
+        for part in self.part_paths:
+            part.unlink(missing_ok=True)
+
+    def write(self, pcm: np.ndarray) -> None:
+        # Fail now rather than after the rest of the track has been separated
+        if self.error is not None:
+            outputs = ", ".join(str(p) for p in self.out_mp3s)
+            raise AppError(f"MP3 encoding failed for {outputs}: {self.error}", 10)
+        self.queue.put(np.ascontiguousarray(pcm, dtype="<f4"))
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self._finish()
+        except BaseException:
+            self._discard()
+            raise
+        for part, out_mp3 in zip(self.part_paths, self.out_mp3s):
+            os.replace(part, out_mp3)
+
+    def abort(self) -> None:
+        self._kill()
+        self.queue.put(None)
+        self.thread.join()
+        self._release()
+        self._discard()
+
+
+class LameStemEncoder(StemEncoder):
+    """
+    Encodes stem number `stem` in-process through libmp3lame (lameenc) and writes the
+    MP3 directly.
+    """
+
+    def __init__(self, samplerate: int, channels: int, stem: int, out_mp3: Path, bitrate_kbps: int) -> None:
+        import lameenc  # type: ignore
+
+        super().__init__([out_mp3])
+        self.columns = slice(stem * channels, (stem + 1) * channels)
+        self.out_mp3 = out_mp3
+        self.encoder = lameenc.Encoder()
+        self.encoder.set_bit_rate(bitrate_kbps)
+        self.encoder.set_in_sample_rate(samplerate)
+        self.encoder.set_channels(channels)
+        self.encoder.set_quality(2)
+        # Conversion buffers, reused for every chunk of the same shape
+        self.scratch = np.empty((0, channels), dtype=np.float32)
+        self.pcm16 = np.empty((0, channels), dtype="<i2")
+        self.out = self.part_paths[0].open("wb")
+        self.thread.start()
+
+    def _encode(self, chunk: np.ndarray) -> None:
+        # The strided column view is compacted by the first ufunc, so no extra copy
+        pcm = chunk[:, self.columns]
+        if self.pcm16.shape != pcm.shape:
+            self.scratch = np.empty(pcm.shape, dtype=np.float32)
+            self.pcm16 = np.empty(pcm.shape, dtype="<i2")
+        f32_to_i16(pcm, self.pcm16, self.scratch)
+        # lameenc reads the array's buffer directly (it rejects memoryview/bytearray)
+        self.out.write(self.encoder.encode(self.pcm16))
+
+    def _finish(self) -> None:
+        try:
+            if self.error is None:
+                self.out.write(self.encoder.flush())
+        except Exception as e:
+            self.error = e
+        finally:
+            self.out.close()
+        if self.error is not None:
+            raise AppError(f"MP3 encoding failed for {self.out_mp3}: {self.error}", 10)
+
+    def _release(self) -> None:
+        self.out.close()
+
+
+class FfmpegStemEncoder(StemEncoder):
+    """
+    Pipes all stems into a single ffmpeg/libmp3lame process, which splits the channels
+    back out and writes one MP3 per stem; used when lameenc is unavailable.
+    """
+
+    def __init__(
+        self,
+        ffmpeg: str,
+        samplerate: int,
+        channels: int,
+        out_mp3s: list[Path],
+        bitrate_kbps: int,
+    ) -> None:
+        super().__init__(out_mp3s)
+        # [0:a] -> asplit -> one pan per stem picking its channels, e.g. c0=c2|c1=c3
+        splits = "".join(f"[in{i}]" for i in range(len(out_mp3s)))
+        graph = [f"[0:a]asplit={len(out_mp3s)}{splits}"]
+        outputs: list[str] = []
+        for i, part in enumerate(self.part_paths):
+            picks = "|".join(f"c{c}=c{i * channels + c}" for c in range(channels))
+            graph.append(f"[in{i}]pan={channels}c|{picks}[stem{i}]")
+            outputs += [
+                "-map",
+                f"[stem{i}]",
+                "-codec:a",
+                "libmp3lame",
+                "-b:a",
+                f"{bitrate_kbps}k",
+                # The .part suffix hides the container from ffmpeg's guess
+                "-f",
+                "mp3",
+                str(part),
+            ]
+        cmd = [
+            ffmpeg,
+            *ffmpeg_log_args(),
+            "-y",
+            "-f",
+            "f32le",
+            "-ar",
+            str(samplerate),
+            "-ac",
+            str(channels * len(out_mp3s)),
+            "-i",
+            "pipe:0",
+            "-filter_complex",
+            ";".join(graph),
+            *outputs,
+        ]
+        if _VERBOSE:
+            print(">>", *cmd)
+        self.cmd = cmd
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        self.thread.start()
+
+    def _encode(self, chunk: np.ndarray) -> None:
+        assert self.proc.stdin is not None
+        self.proc.stdin.write(chunk)
+
+    def _finish(self) -> None:
+        assert self.proc.stdin is not None
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        if returncode != 0 or self.error is not None:
+            raise AppError(f"Command failed ({returncode}): {' '.join(self.cmd)}", 10)
+
+    def _kill(self) -> None:
+        self.proc.kill()
+
+    def _release(self) -> None:
+        self.proc.wait()
+
+
+def open_stem_encoders(
+    ffmpeg: str,
+    samplerate: int,
+    channels: int,
+    out_mp3s: list[Path],
+    bitrate_kbps: int,
+) -> list[StemEncoder]:
     """
-    Uses Demucs as a library and writes stems using soundfile (not torchaudio).
-    Output: out_dir/vocals.wav and out_dir/other.wav
+    One lameenc encoder per stem, each on its own thread; without lameenc, a single
+    ffmpeg process encodes every stem.
     """
+    if importlib.util.find_spec("lameenc") is None:
+        return [FfmpegStemEncoder(ffmpeg, samplerate, channels, out_mp3s, bitrate_kbps)]
+    encoders: list[StemEncoder] = []
     try:
+        for stem, out_mp3 in enumerate(out_mp3s):
+            encoders.append(LameStemEncoder(samplerate, channels, stem, out_mp3, bitrate_kbps))
+    except BaseException:
+        # Don't leak the threads and .part files of the encoders already started
+        for encoder in encoders:
+            encoder.abort()
+        raise
+    return encoders
+
+
+class PinnedRing:
+    """
+    Round-robin pinned host buffers for copying separated chunks off the GPU. Pinned
+    memory lets the copy DMA straight into host RAM instead of through the driver's
+    pageable staging. A buffer is handed to the encoders as a NumPy view, so the ring
+    must be deeper than what the encoders can still be holding (see PINNED_BUFFERS).
+    """
+
+    def __init__(self, rows: int, cols: int, count: int) -> None:
+        import torch  # type: ignore
+
+        self.buffers = [torch.empty(rows, cols, dtype=torch.float32, pin_memory=True) for _ in range(count)]
+        self.next = 0
+
+    def copy(self, src: torch.Tensor) -> np.ndarray:
+        import torch  # type: ignore
+
+        buf = self.buffers[self.next][: src.shape[0]]
+        self.next = (self.next + 1) % len(self.buffers)
+        buf.copy_(src, non_blocking=True)
+        torch.cuda.current_stream().synchronize()
+        return buf.numpy()
+
+
+@dataclass
+class DemucsModel:
+    """
+    A loaded Demucs model (or bag of models) plus the settings for running its
+    forward pass over one fixed-size segment.
+    """
+    model: Any
+    device: str
+    segment_length: int
+    autocast_dtype: Optional[torch.dtype] = None
+    host_staging: Optional[PinnedRing] = None
+
+    @property
+    def samplerate(self) -> int:
+        return self.model.samplerate
+
+    @property
+    def audio_channels(self) -> int:
+        return self.model.audio_channels
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self.model.sources)
+
+    def autocast(self) -> contextlib.AbstractContextManager:
+        if self.autocast_dtype is None:
+            return contextlib.nullcontext()
         import torch  # type: ignore
+
+        return torch.autocast(device_type="cuda", dtype=self.autocast_dtype)
+
+    def forward(self, segment: torch.Tensor) -> torch.Tensor:
+        """
+        Separates one [1, C, segment_length] segment into float32 [1, S, C, segment_length].
+        """
         from demucs.apply import apply_model  # type: ignore
+
+        with self.autocast():
+            out = apply_model(self.model, segment, shifts=0, split=False, device=self.device)
+        return out.float()
+
+
+# Loaded models keyed by (model_name, device, precision, compiled); reused across files in one process.
+_MODEL_CACHE: dict[tuple[str, str, str, bool], DemucsModel] = {}
+
+
+def compile_model(model) -> None:
+    """
+    Switches conv weights to channels-last and compiles each network's forward with
+    TorchInductor. 'reduce-overhead' also records CUDA graphs where the model allows it.
+    """
+    import torch  # type: ignore
+
+    # Patch forward on the instances so demucs' isinstance() checks still see HTDemucs
+    for net in getattr(model, "models", [model]):
+        net.to(memory_format=torch.channels_last)
+        net.forward = torch.compile(net.forward, mode="reduce-overhead", fullgraph=False)
+
+
+def load_demucs_model(
+    model_name: str,
+    device: str,
+    precision: str = "fp32",
+    compiled: bool = False,
+) -> DemucsModel:
+    cache_key = (model_name, device, precision, compiled)
+    cached = _MODEL_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
         from demucs.pretrained import get_model  # type: ignore
-        from demucs.audio import AudioFile  # type: ignore
     except Exception as e:
         raise AppError(f"Failed to import Demucs dependencies: {e}", 20)
 
-    out_dir.mkdir(parents=True, exist_ok=True)
-
     model = get_model(model_name)
     model.to(device)
     model.eval()
 
-    # Load audio using Demucs' AudioFile helper; returns torch tensor [C, T]
-    af = AudioFile(str(wav_path))
-    wav = af.read(streams=0, samplerate=model.samplerate, channels=model.audio_channels)
-    # Add batch dim -> [1, C, T]
-    wav = wav.unsqueeze(0)
-
-    with torch.no_grad():
-        # sources: [1, S, C, T]
-        sources = apply_model(model, wav, device=device, progress=True)
-
-    # Map sources to names
     # For htdemucs and most models, model.sources includes 'vocals', 'drums', 'bass', 'other', etc.
     source_names = list(getattr(model, "sources", []))
     if "vocals" not in source_names or "other" not in source_names:
@@ -154,30 +574,169 @@ def separate_with_demucs_library(
             21,
         )
 
-    vocals_idx = source_names.index("vocals")
-    other_idx = source_names.index("other")
+    # Same segment size demucs.apply.apply_model(split=True) uses
+    segment = min(float(m.segment) for m in getattr(model, "models", [model]))
+    dm = DemucsModel(model=model, device=device, segment_length=int(model.samplerate * segment))
+    if precision != "fp32":
+        # Weights stay fp32; autocast runs convs/matmuls on tensor cores in half precision
+        # while the STFT/iSTFT and normalisations stay in fp32.
+        import torch  # type: ignore
+
+        dm.autocast_dtype = torch.bfloat16 if precision == "bf16" else torch.float16
+    if device == "cuda":
+        # Largest chunk separation yields is one segment of all (vocals, other) channels
+        dm.host_staging = PinnedRing(dm.segment_length, 2 * dm.audio_channels, PINNED_BUFFERS)
+        if compiled:
+            compile_model(model)
 
-    vocals = sources[0, vocals_idx]  # [C, T]
-    other = sources[0, other_idx]    # [C, T]
+    _MODEL_CACHE[cache_key] = dm
+    return dm
 
-    # Convert to numpy float32 for soundfile
-    vocals_np = vocals.detach().cpu().numpy().T.astype(np.float32)  # [T, C]
-    other_np = other.detach().cpu().numpy().T.astype(np.float32)    # [T, C]
 
-    vocals_wav = out_dir / "vocals.wav"
-    other_wav = out_dir / "other.wav"
+def separate_with_demucs_library(
+    model: DemucsModel,
+    wav: np.ndarray,
+    samplerate: int,
+    device: str,
+) -> Iterator[torch.Tensor]:
+    """
+    Runs Demucs segment by segment over an in-memory waveform shaped [C, T].
+    Yields finished chunks shaped [2, C, n] holding (vocals, other) as soon as the overlap-add
+    for that span is complete, so peak memory is one segment rather than one song.
+    """
+    try:
+        import torch  # type: ignore
+        import tqdm  # type: ignore
+        from demucs.apply import TensorChunk  # type: ignore
+        from demucs.audio import convert_audio  # type: ignore
+    except Exception as e:
+        raise AppError(f"Failed to import Demucs dependencies: {e}", 20)
 
-    sf.write(str(vocals_wav), vocals_np, model.samplerate)
-    sf.write(str(other_wav), other_np, model.samplerate)
+    # ffmpeg already decoded to 44.1kHz stereo; only resample if the model expects otherwise
+    mix = torch.from_numpy(wav)
+    if samplerate != model.samplerate or mix.shape[0] != model.audio_channels:
+        mix = convert_audio(mix, samplerate, model.samplerate, model.audio_channels)
+    # Add batch dim -> [1, C, T]
+    mix = mix.unsqueeze(0)
+    length = mix.shape[-1]
+
+    source_names = model.sources
+    stem_idx = [source_names.index("vocals"), source_names.index("other")]
+
+    # Same triangular cross-fade as demucs.apply.apply_model(split=True)
+    segment_length = model.segment_length
+    stride = int((1 - SEGMENT_OVERLAP) * segment_length)
+    with torch.inference_mode():
+        weight = torch.cat([
+            torch.arange(1, segment_length // 2 + 1, device=device),
+            torch.arange(segment_length - segment_length // 2, 0, -1, device=device),
+        ]).float()
+        weight /= weight.max()
+
+        # Ring buffer over the current segment: [2, C, segment_length] for (vocals, other)
+        acc = torch.zeros(2, mix.shape[1], segment_length, device=device)
+        acc_weight = torch.zeros(segment_length, device=device)
+
+    offsets = range(0, length, stride)
+    scale = float(format(stride / model.samplerate, ".2f"))
+    for offset in tqdm.tqdm(offsets, unit_scale=scale, ncols=120, unit="seconds"):
+        last = offset + stride >= length
+        with torch.inference_mode():
+            chunk = TensorChunk(mix, offset, segment_length)
+            n = chunk.length
+            # Every segment runs at the full fixed size (the last one padded with context,
+            # like apply_model does), so a compiled model only ever sees one input shape.
+            # out: [1, S, C, segment_length] -> centre n samples
+            out = model.forward(chunk.padded(segment_length))
+            lead = (segment_length - n) // 2
+            out = out[..., lead:lead + n]
+            acc[..., :n] += weight[:n] * out[0, stem_idx]
+            acc_weight[:n] += weight[:n]
+
+            # Nothing later overlaps [offset, offset + stride), so that span is final
+            span = n if last else stride
+            done = acc[..., :span] / acc_weight[:span]
+            if not last:
+                acc = torch.roll(acc, -stride, dims=-1)
+                acc[..., -stride:] = 0
+                acc_weight = torch.roll(acc_weight, -stride)
+                acc_weight[-stride:] = 0
+
+        yield done
+        if last:
+            break
+
+
+def stems_to_pcm(stems: torch.Tensor, staging: Optional[PinnedRing] = None) -> np.ndarray:
+    """
+    Interleaves [K, C, T] stems to [T, K*C] float32, the layout the MP3 encoders take.
+    The permute happens on the stems' device so a single contiguous copy comes back,
+    into a reused pinned buffer when `staging` is given.
+    """
+    k, c, t = stems.shape
+    pcm = stems.permute(2, 0, 1).reshape(t, k * c).contiguous().float()
+    if staging is not None and pcm.is_cuda:
+        return staging.copy(pcm)
+    return pcm.cpu().numpy()
+
+
+def extract_stems(
+    ffmpeg: str,
+    model: DemucsModel,
+    wav: np.ndarray,
+    vocals_mp3: Path,
+    inst_mp3: Path,
+    bitrate_kbps: int,
+) -> None:
+    print("2) Separating stems via Demucs (library mode) and streaming them to MP3...")
+    encoders = open_stem_encoders(
+        ffmpeg, model.samplerate, model.audio_channels, [vocals_mp3, inst_mp3], bitrate_kbps
+    )
+    closed = 0
+    try:
+        for stems in separate_with_demucs_library(model, wav, SAMPLE_RATE, model.device):
+            pcm = stems_to_pcm(stems, model.host_staging)
+            for encoder in encoders:
+                encoder.write(pcm)
+        for encoder in encoders:
+            encoder.close()
+            closed += 1
+    except BaseException:
+        # Includes a failed close(): every encoder not yet closed drops its .part files
+        for encoder in encoders[closed:]:
+            encoder.abort()
+        raise
+
+
+def submit_daemon(fn, *args) -> Future:
+    """
+    Runs fn(*args) on a daemon thread. Unlike a ThreadPoolExecutor worker, the thread is
+    not joined at exit, so Ctrl-C or an error never waits for a model download or decode.
+    """
+    future: Future = Future()
 
-    return vocals_wav, other_wav
+    def target() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
 
 
 def main(argv: Optional[list[str]] = None) -> None:
     ap = argparse.ArgumentParser(
-        description="Extract vocals + instrumental (karaoke-style) from any media file and output MP3 stems."
+        description="Extract vocals + instrumental (karaoke-style) from media files and output MP3 stems."
+    )
+    ap.add_argument(
+        "input",
+        nargs="+",
+        help="Input audio/video file(s) (any format supported by ffmpeg). "
+        "Multiple files share one loaded model.",
     )
-    ap.add_argument("input", help="Input audio/video file (any format supported by ffmpeg).")
     ap.add_argument("--outdir", default="outputs", help="Output directory.")
     ap.add_argument("--model", default="htdemucs", help="Demucs model (default: htdemucs).")
     ap.add_argument(
@@ -186,54 +745,75 @@ def main(argv: Optional[list[str]] = None) -> None:
         choices=["auto", "cpu", "cuda", "mps"],
         help="Compute device for Demucs. 'auto' uses CUDA if available else CPU.",
     )
+    ap.add_argument(
+        "--precision",
+        default="auto",
+        choices=["auto", "fp32", "fp16", "bf16"],
+        help="Inference precision on CUDA. 'auto' uses bf16 on Ampere or newer else fp16; other devices use fp32.",
+    )
+    ap.add_argument(
+        "--compile",
+        action="store_true",
+        help="On CUDA, compile the model with torch.compile. Slow first segment; pays off on long or many inputs.",
+    )
     ap.add_argument("--bitrate", default="192k", help="MP3 bitrate (e.g., 128k/192k/256k/320k).")
-    ap.add_argument("--keep-temp", action="store_true", help="Keep temporary working directory.")
+    ap.add_argument("--verbose", action="store_true", help="Echo ffmpeg commands and show ffmpeg's own output.")
+    # Audio is now piped through memory; kept so existing scripts don't break.
+    ap.add_argument("--keep-temp", action="store_true", help=argparse.SUPPRESS)
     args = ap.parse_args(argv)
 
+    global _VERBOSE
+    _VERBOSE = args.verbose
+
     try:
         ffmpeg = which_or_fail("ffmpeg")
+        bitrate_kbps = parse_bitrate_kbps(args.bitrate)
 
-        inp = Path(args.input).expanduser().resolve()
-        validate_input_file(inp)
+        inputs = [Path(p).expanduser().resolve() for p in args.input]
+        for inp in inputs:
+            validate_input_file(inp)
 
         outdir = Path(args.outdir).expanduser().resolve()
         outdir.mkdir(parents=True, exist_ok=True)
 
-        base = to_snake_case(inp.stem)
         date_stamp = stamp_yyyymmdd()
-
-        vocals_mp3 = outdir / f"{base}_{date_stamp}_vocals.mp3"
-        inst_mp3 = outdir / f"{base}_{date_stamp}_instrumental.mp3"
+        bases: dict[str, Path] = {}
+        for inp in inputs:
+            base = to_snake_case(inp.stem)
+            if base in bases:
+                raise AppError(f"Inputs would overwrite each other's outputs: {bases[base]} and {inp}", 4)
+            bases[base] = inp
 
         device = pick_device(args.device)
-        print(f"Using device for Demucs: {device}")
-
-        tmp_root = Path(tempfile.mkdtemp(prefix="karaoke_extract_"))
-        try:
-            tmp_wav = tmp_root / f"{base}.wav"
-            stems_dir = tmp_root / "stems"
-
-            print(f"Temp workspace: {tmp_root}")
-            print("1) Converting input -> WAV via ffmpeg...")
-            ffmpeg_convert_to_wav(ffmpeg, inp, tmp_wav)
-
-            print("2) Separating stems via Demucs (library mode)...")
-            vocals_wav, other_wav = separate_with_demucs_library(tmp_wav, args.model, device, stems_dir)
-
-            print("3) Encoding stems to MP3...")
-            audio_to_mp3(ffmpeg, vocals_wav, vocals_mp3, args.bitrate)
-            audio_to_mp3(ffmpeg, other_wav, inst_mp3, args.bitrate)
+        precision = pick_precision(args.precision, device)
+        print(f"Using device for Demucs: {device} ({precision})")
+        disable_autograd()
+
+        items = list(bases.items())
+        # Model load and decoding are independent, so the first decode overlaps the
+        # model load and each later decode overlaps the previous file's separation.
+        # The model is loaded once and kept resident for every input.
+        model_future = submit_daemon(load_demucs_model, args.model, device, precision, args.compile)
+        wav_future = submit_daemon(decode_input, ffmpeg, items[0][1], SAMPLE_RATE, CHANNELS)
+
+        for i, (base, inp) in enumerate(items, 1):
+            vocals_mp3 = outdir / f"{base}_{date_stamp}_vocals.mp3"
+            inst_mp3 = outdir / f"{base}_{date_stamp}_instrumental.mp3"
+
+            if len(items) > 1:
+                print(f"\n[{i}/{len(items)}] {inp}")
+            print("1) Decoding input -> PCM...")
+            wav = wav_future.result()
+            if i < len(items):
+                wav_future = submit_daemon(decode_input, ffmpeg, items[i][1], SAMPLE_RATE, CHANNELS)
+
+            model = model_future.result()
+            extract_stems(ffmpeg, model, wav, vocals_mp3, inst_mp3, bitrate_kbps)
 
             print("\n✅ Done.")
             print(f"Vocals:       {vocals_mp3}")
             print(f"Instrumental: {inst_mp3}")
 
-        finally:
-            if args.keep_temp:
-                print(f"🧪 Kept temp directory: {tmp_root}")
-            else:
-                shutil.rmtree(tmp_root, ignore_errors=True)
-
     except AppError as e:
         print(f"ERROR: {e}", file=sys.stderr)
         raise SystemExit(e.exit_code)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+demucs_apply = pytest.importorskip("demucs.apply")
+
+from karaoke_extractor.cli import DemucsModel, separate_with_demucs_library  # noqa: E402
+
+SAMPLE_RATE = 100
+SEGMENT = 0.4  # 40-sample segments, 30-sample stride at 25% overlap
+
+
+class StubModel(torch.nn.Module):
+    """
+    Tiny stand-in for a Demucs model: one fixed random convolution per source, so every
+    output sample depends on its neighbours and the segment padding and cross-fade matter.
+    """
+
+    samplerate = SAMPLE_RATE
+    audio_channels = 2
+    sources = ["drums", "bass", "other", "vocals"]
+    segment = SEGMENT
+
+    def __init__(self) -> None:
+        super().__init__()
+        gen = torch.Generator().manual_seed(0)
+        self.convs = torch.nn.ModuleList()
+        for _ in self.sources:
+            conv = torch.nn.Conv1d(2, 2, kernel_size=9, padding=4, bias=False)
+            conv.weight.data = torch.randn(conv.weight.shape, generator=gen)
+            self.convs.append(conv)
+
+    def valid_length(self, length: int) -> int:
+        # Like HTDemucs: always evaluate on full training-length segments
+        return int(self.samplerate * self.segment)
+
+    def forward(self, mix):
+        return torch.stack([conv(mix) for conv in self.convs], dim=1)
+
+
+@pytest.mark.parametrize("length", [17, 90, 107])
+def test_streamed_overlap_add_matches_apply_model(length):
+    """
+    Shorter than one stride, an exact multiple of the stride, and a ragged length.
+    """
+    model = StubModel().eval()
+    wav = np.random.default_rng(length).standard_normal((2, length)).astype(np.float32)
+    dm = DemucsModel(model=model, device="cpu", segment_length=int(SAMPLE_RATE * SEGMENT))
+
+    chunks = list(separate_with_demucs_library(dm, wav, SAMPLE_RATE, "cpu"))
+    streamed = torch.cat(chunks, dim=-1)
+
+    with torch.no_grad():
+        ref = demucs_apply.apply_model(model, torch.from_numpy(wav)[None], shifts=0, split=True, overlap=0.25)
+    stem_idx = [model.sources.index("vocals"), model.sources.index("other")]
+
+    assert streamed.shape == (2, 2, length)
+    torch.testing.assert_close(streamed, ref[0, stem_idx])